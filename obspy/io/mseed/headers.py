@@ -698,6 +698,18 @@ __clibmseed.msr_decode_steim1.argtypes = [
     C.c_int, C.c_char_p, C.c_int]
 __clibmseed.msr_decode_steim1.restype = C.c_int
 
+__clibmseed.decodeSteimBlocks.argtypes = [
+    C.c_void_p,
+    C.c_int,
+    C.c_int,
+    C.c_int,
+    np.ctypeslib.ndpointer(dtype=np.intc, ndim=1,
+                           flags='C_CONTIGUOUS'),
+    np.ctypeslib.ndpointer(dtype=np.int32, ndim=1,
+                           flags='C_CONTIGUOUS'),
+    C.c_int, C.c_int, C.c_int]
+__clibmseed.decodeSteimBlocks.restype = C.c_int
+
 # tricky, C.POINTER(C.c_char) is a pointer to single character fields
 # this is completely different to C.c_char_p which is a string
 __clibmseed.mst_packgroup.argtypes = [
@@ -694,3 +694,50 @@ readMSEEDBuffer (char *mseed, int buflen, Selections *selections, flag
     }
     return idListHead;
 }
+
+
+// Decodes Steim 1 or Steim 2 compressed data of multiple equally sized and
+// equally spaced blocks of memory (e.g. the payloads of consecutive Reftek
+// 130 data packets) to one contiguous output array with a single call.
+// The sample data of block i starts at input + i * stride and is decoded to
+// samplecounts[i] samples directly following the samples of block i - 1.
+// Returns the overall number of decoded samples or -1 on error.
+int
+decodeSteimBlocks (char *input, int stride, int inputlength, int blockcount,
+                   int *samplecounts, int32_t *output, int outputlength,
+                   int steimversion, int swapflag)
+{
+    int i;
+    int nsamples;
+    int pos = 0;
+    int total = 0;
+
+    for (i = 0; i < blockcount; i++) {
+        if (pos + samplecounts[i] > outputlength) {
+            ms_log(1, "decodeSteimBlocks(): Output buffer too small.\n");
+            return -1;
+        }
+        if (steimversion == 1) {
+            nsamples = msr_decode_steim1(
+                (int32_t *)(input + (long long)i * stride), inputlength,
+                samplecounts[i], output + pos, samplecounts[i], NULL,
+                swapflag);
+        }
+        else if (steimversion == 2) {
+            nsamples = msr_decode_steim2(
+                (int32_t *)(input + (long long)i * stride), inputlength,
+                samplecounts[i], output + pos, samplecounts[i], NULL,
+                swapflag);
+        }
+        else {
+            ms_log(1, "decodeSteimBlocks(): Unknown Steim version %d.\n",
+                   steimversion);
+            return -1;
+        }
+        if (nsamples > 0) {
+            total += nsamples;
+        }
+        pos += samplecounts[i];
+    }
+    return total;
+}
@@ -4,6 +4,7 @@ REFTEK130 read support, core routines.
 """
 import copy
 import io
+import mmap
 import os
 import warnings
 
@@ -12,9 +13,10 @@ import numpy as np
 from obspy import Trace, Stream, UTCDateTime
 from obspy.core.util.obspy_types import ObsPyException
 
-from .packet import (Packet, EHPacket, _initial_unpack_packets, PACKET_TYPES,
-                     PACKET_TYPES_IMPLEMENTED, PACKET_FINAL_DTYPE,
-                     Reftek130UnpackPacketError, _unpack_C0_C2_data)
+from .packet import (Packet, EHPacket, _initial_unpack_packets,
+                     PACKET_TYPES_BYTES, PACKET_TYPES_IMPLEMENTED_BYTES,
+                     PACKET_FINAL_DTYPE, Reftek130UnpackPacketError,
+                     _unpack_C0_C2_data)
 
 
 NOW = UTCDateTime()
@@ -45,16 +47,11 @@ def _is_reftek130(filename):
         return False
 
     with open(filename, 'rb') as fp:
-        # check first 20 expected packets' type header field
-        for i in range(20):
-            packet_type = fp.read(2).decode("ASCII", "replace")
-            if not packet_type:
-                # reached end of file..
-                break
-            if packet_type not in PACKET_TYPES:
-                return False
-            fp.seek(1022, os.SEEK_CUR)
-    return True
+        data = fp.read(20 * 1024)
+    # check first 20 expected packets' type header field, looking at the data
+    # as two-byte strings every packet type is at a multiple of 512
+    packet_types = np.frombuffer(data, dtype="|S2")[::512]
+    return bool(np.all(np.in1d(packet_types, PACKET_TYPES_BYTES)))
 
 
 def _read_reftek130(filename, network="", location="", component_codes=None,
@@ -142,7 +139,14 @@ class Reftek130(object):
     @staticmethod
     def from_file(filename):
         with io.open(filename, "rb") as fh:
-            string = fh.read()
+            # map the file into memory instead of reading it into a bytes
+            # object first, the packets get copied to the final packet array
+            # during unpacking anyway
+            try:
+                string = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # e.g. empty files can not be mapped
+                string = fh.read()
         rt = Reftek130()
         rt._data = _initial_unpack_packets(string)
         rt._filename = filename
@@ -162,8 +166,11 @@ class Reftek130(object):
             msg = ("Detected permuted packet sequence, sorting.")
             warnings.warn(msg)
             if sort_permuted_package_sequence:
-                self._data.sort(order=[
-                    key for key in ("packet_sequence", "time")])
+                # sort on the two key columns only (last key is primary),
+                # instead of having numpy compare whole packet records
+                order = np.lexsort((self._data['time'],
+                                    self._data['packet_sequence']))
+                self._data = self._data[order]
 
     def check_packet_sequence_contiguous(self):
         """
@@ -182,8 +189,7 @@ class Reftek130(object):
         and drop them showing a warning message.
         """
         is_implemented = np.in1d(
-            self._data['packet_type'],
-            [x.encode() for x in PACKET_TYPES_IMPLEMENTED])
+            self._data['packet_type'], PACKET_TYPES_IMPLEMENTED_BYTES)
         # if all packets are of a type that is implemented, the nothing to do..
         if np.all(is_implemented):
             return
@@ -221,12 +227,30 @@ class Reftek130(object):
                    "non-implemented packets (file: {})").format(self._filename)
             raise Reftek130Exception(msg)
         st = Stream()
-        for event_number in np.unique(self._data['event_number']):
-            data = self._data[self._data['event_number'] == event_number]
+        no_channel_code = False
+        # group packets using contiguous copies of the few header columns
+        # that are needed and only work with indices into the packet array,
+        # so that full packets (including their 1 kB payload) only get picked
+        # once for every contiguous block of data packets
+        packet_types = np.ascontiguousarray(self._data['packet_type'])
+        event_numbers = np.ascontiguousarray(self._data['event_number'])
+        channel_numbers = np.ascontiguousarray(self._data['channel_number'])
+        times = np.ascontiguousarray(self._data['time'])
+        numbers_of_samples = np.ascontiguousarray(
+            self._data['number_of_samples'])
+        # sort all packets once up front, by event number and inside each
+        # event data packets after the other packets and by channel number.
+        # lexsort is stable, so packet sequence order is kept otherwise.
+        order = np.lexsort(
+            (channel_numbers, packet_types == b"DT", event_numbers))
+        event_boundaries = np.flatnonzero(
+            event_numbers[order][1:] != event_numbers[order][:-1]) + 1
+        for inds_event in np.split(order, event_boundaries):
+            packet_types_ = packet_types[inds_event]
             # we should have exactly one EH and one ET packet, truncated data
             # sometimes misses the header or trailer packet.
-            eh_packets = data[data['packet_type'] == b"EH"]
-            et_packets = data[data['packet_type'] == b"ET"]
+            eh_packets = inds_event[packet_types_ == b"EH"]
+            et_packets = inds_event[packet_types_ == b"ET"]
             if len(eh_packets) == 0 and len(et_packets) == 0:
                 msg = ("Reftek data contains data packets without "
                        "corresponding header or trailer packet.")
@@ -246,9 +270,9 @@ class Reftek130(object):
             # use either the EH or ET packet, they have the same content (only
             # trigger stop time is not in EH)
             if len(eh_packets):
-                eh = EHPacket(eh_packets[0])
+                eh = EHPacket(self._data[eh_packets[0]])
             else:
-                eh = EHPacket(et_packets[0])
+                eh = EHPacket(self._data[et_packets[0]])
             # only C0, C2, 16, 32 encodings supported right now
             if eh.data_format == b"C0":
                 encoding = 'C0'
@@ -271,127 +295,135 @@ class Reftek130(object):
                 "reftek130": eh._to_dict()}
             delta = 1.0 / eh.sampling_rate
             delta_nanoseconds = int(delta * 1e9)
-            inds_dt = data['packet_type'] == b"DT"
-            data_channels = np.unique(data[inds_dt]['channel_number'])
-            for channel_number in data_channels:
-                inds = data['channel_number'] == channel_number
-                # channel number of EH/ET packets also equals zero (one of the
-                # three unused bytes in the extended header of EH/ET packets)
-                inds &= data['packet_type'] == b"DT"
-                packets = data[inds]
-
-                # split into contiguous blocks, i.e. find gaps. packet sequence
-                # was sorted already..
-                endtimes = (
-                    packets[:-1]["time"] +
-                    packets[:-1]["number_of_samples"].astype(np.int64) *
-                    delta_nanoseconds)
-                # check if next starttime matches seamless to last chunk
-                # 1e-3 seconds == 1e6 nanoseconds is the smallest time
-                # difference reftek130 format can represent, so anything larger
-                # or equal means a gap/overlap.
-                time_diffs_milliseconds_abs = np.abs(
-                    packets[1:]["time"] - endtimes) / 1000000
-                gaps = time_diffs_milliseconds_abs >= 1
-                if np.any(gaps):
-                    gap_split_indices = np.nonzero(gaps)[0] + 1
-                    contiguous = np.array_split(packets, gap_split_indices)
+            # channel number of EH/ET packets also equals zero (one of the
+            # three unused bytes in the extended header of EH/ET packets).
+            # data packets are sorted by channel number already.
+            inds_dt = inds_event[packet_types_ == b"DT"]
+            if not len(inds_dt):
+                continue
+            channel_numbers_dt = channel_numbers[inds_dt]
+            times_ = times[inds_dt]
+            numbers_of_samples_ = numbers_of_samples[inds_dt]
+
+            # split into contiguous blocks of one channel each in one go,
+            # i.e. find channel boundaries and gaps.
+            endtimes = (
+                times_[:-1] +
+                numbers_of_samples_[:-1].astype(np.int64) * delta_nanoseconds)
+            # check if next starttime matches seamless to last chunk
+            # 1e-3 seconds == 1e6 nanoseconds is the smallest time difference
+            # reftek130 format can represent, so anything larger or equal
+            # means a gap/overlap. compare in integer nanoseconds right away,
+            # no need for an intermediate float array.
+            breaks = channel_numbers_dt[1:] != channel_numbers_dt[:-1]
+            breaks |= np.abs(times_[1:] - endtimes) >= 1000000
+            contiguous = np.split(inds_dt, np.flatnonzero(breaks) + 1)
+
+            # unpack Steim compressed data of all data packets of the event
+            # with a single call, sample data of the contiguous blocks then
+            # are just consecutive slices of it
+            if not headonly and encoding in ('C0', 'C2'):
+                sample_data_event = _unpack_C0_C2_data(
+                    self._data[inds_dt], encoding)
+                sample_offset = 0
+
+            for inds_ in contiguous:
+                channel_number = channel_numbers[inds_[0]]
+                starttime = times[inds_[0]]
+
+                if headonly:
+                    sample_data = np.array([], dtype=np.int32)
+                    npts = numbers_of_samples[inds_].sum()
                 else:
-                    contiguous = [packets]
-
-                for packets_ in contiguous:
-                    starttime = packets_[0]['time']
-
-                    if headonly:
-                        sample_data = np.array([], dtype=np.int32)
-                        npts = packets_["number_of_samples"].sum()
-                    else:
-                        if encoding in ('C0', 'C2'):
-                            sample_data = _unpack_C0_C2_data(packets_,
-                                                             encoding)
-                        elif encoding in ('16', '32'):
-                            # rt130 stores in big endian
-                            dtype = {'16': '>i2', '32': '>i4'}[encoding]
-                            # just fix endianness and use correct dtype
-                            sample_data = np.require(
-                                packets_['payload'],
-                                requirements=['C_CONTIGUOUS'])
-                            # either int16 or int32
-                            sample_data = sample_data.view(dtype)
-                            # account for number of samples, i.e. some packets
-                            # might not use the full payload size but have
-                            # empty parts at the end that need to be cut away
-                            number_of_samples_max = sample_data.shape[1]
-                            sample_data = sample_data.flatten()
-                            # go through packets starting at the back,
-                            # otherwise indices of later packets would change
-                            # while looping
-                            for ind, num_samps in reversed([
-                                    (ind, num_samps) for ind, num_samps in
-                                    enumerate(packets_["number_of_samples"])
-                                    if num_samps != number_of_samples_max]):
-                                # looping backwards we can easily find the
-                                # start of each packet, since the earlier
-                                # packets are still untouched and at maximum
-                                # sample length in our big array with all
-                                # packets
-                                start_of_packet = ind * number_of_samples_max
-                                start_empty_part = start_of_packet + num_samps
-                                end_empty_part = (start_of_packet +
-                                                  number_of_samples_max)
-                                sample_data = np.delete(
-                                    sample_data,
-                                    slice(start_empty_part, end_empty_part))
-                        npts = len(sample_data)
-
-                    tr = Trace(data=sample_data, header=copy.deepcopy(header))
+                    if encoding in ('C0', 'C2'):
+                        npts = int(numbers_of_samples[inds_].sum())
+                        sample_data = sample_data_event[
+                            sample_offset:sample_offset + npts]
+                        sample_offset += npts
+                    elif encoding in ('16', '32'):
+                        # rt130 stores in big endian
+                        dtype = {'16': '>i2', '32': '>i4'}[encoding]
+                        # just fix endianness and use correct dtype. picking
+                        # only the payload column of the block's packets
+                        # directly gives a C contiguous copy of it, no need
+                        # to copy the full packets first.
+                        sample_data = self._data['payload'][inds_]
+                        # either int16 or int32
+                        sample_data = sample_data.view(dtype)
+                        # account for number of samples, i.e. some packets
+                        # might not use the full payload size but have
+                        # empty parts at the end that need to be cut away.
+                        # select the used part of all packets at once with a
+                        # boolean mask (deleting the empty parts packet by
+                        # packet would copy the whole array each time)
+                        number_of_samples_max = sample_data.shape[1]
+                        numbers_of_samples_block = numbers_of_samples[inds_]
+                        if np.all(numbers_of_samples_block ==
+                                  number_of_samples_max):
+                            # all packets full, no need for another copy
+                            sample_data = sample_data.reshape(-1)
+                        else:
+                            used = (
+                                np.arange(number_of_samples_max) <
+                                numbers_of_samples_block[:, np.newaxis])
+                            sample_data = sample_data[used]
+                    npts = len(sample_data)
+
+                # if component codes were explicitly provided, use them
+                # together with the stream label
+                if component_codes is not None:
+                    channel = (eh.stream_name.strip() +
+                               component_codes[channel_number])
+                # otherwise check if channel code is set for the given
+                # channel (seems to be not the case usually)
+                elif eh.channel_code[channel_number] is not None:
+                    channel = eh.channel_code[channel_number]
+                # otherwise fall back to using the stream label together
+                # with the number of the channel in the file (starting with
+                # 0, as Z-1-2 is common use for data streams not oriented
+                # against North)
+                else:
+                    no_channel_code = True
+                    channel = eh.stream_name.strip() + str(channel_number)
+                # set up the full header right away instead of setting
+                # attributes on the stats afterwards. Trace makes a deep copy
+                # of the header anyway, so no need to copy it here.
+                trace_header = dict(
+                    header, channel=channel,
+                    starttime=UTCDateTime(ns=starttime),
                     # channel number is not included in the EH/ET packet
                     # payload, so add it to stats as well..
-                    tr.stats.reftek130['channel_number'] = channel_number
-                    if headonly:
-                        tr.stats.npts = npts
-                    tr.stats.starttime = UTCDateTime(ns=starttime)
-                    # if component codes were explicitly provided, use them
-                    # together with the stream label
-                    if component_codes is not None:
-                        tr.stats.channel = (eh.stream_name.strip() +
-                                            component_codes[channel_number])
-                    # otherwise check if channel code is set for the given
-                    # channel (seems to be not the case usually)
-                    elif eh.channel_code[channel_number] is not None:
-                        tr.stats.channel = eh.channel_code[channel_number]
-                    # otherwise fall back to using the stream label together
-                    # with the number of the channel in the file (starting with
-                    # 0, as Z-1-2 is common use for data streams not oriented
-                    # against North)
-                    else:
-                        msg = ("No channel code specified in the data file "
-                               "and no component codes specified. Using "
-                               "stream label and number of channel in file as "
-                               "channel codes.")
-                        warnings.warn(msg)
-                        tr.stats.channel = (
-                            eh.stream_name.strip() + str(channel_number))
-                    # check if endtime of trace is consistent
-                    t_last = packets_[-1]['time']
-                    npts_last = packets_[-1]['number_of_samples']
-                    try:
-                        if not headonly:
-                            assert npts == len(sample_data)
-                        if npts_last:
-                            assert tr.stats.endtime == UTCDateTime(
-                                ns=t_last) + (npts_last - 1) * delta
-                        if npts:
-                            assert tr.stats.endtime == (
-                                tr.stats.starttime + (npts - 1) * delta)
-                    except AssertionError:
-                        msg = ("Reftek file has a trace with an inconsistent "
-                               "endtime or number of samples. Please open an "
-                               "issue on GitHub and provide your file for"
-                               "testing.")
-                        raise Reftek130Exception(msg)
-                    st += tr
+                    reftek130=dict(header["reftek130"],
+                                   channel_number=channel_number))
+                if headonly:
+                    trace_header["npts"] = npts
+                tr = Trace(data=sample_data, header=trace_header)
+                # check if endtime of trace is consistent
+                t_last = times[inds_[-1]]
+                npts_last = numbers_of_samples[inds_[-1]]
+                try:
+                    if not headonly:
+                        assert npts == len(sample_data)
+                    if npts_last:
+                        assert tr.stats.endtime == UTCDateTime(
+                            ns=t_last) + (npts_last - 1) * delta
+                    if npts:
+                        assert tr.stats.endtime == (
+                            tr.stats.starttime + (npts - 1) * delta)
+                except AssertionError:
+                    msg = ("Reftek file has a trace with an inconsistent "
+                           "endtime or number of samples. Please open an "
+                           "issue on GitHub and provide your file for"
+                           "testing.")
+                    raise Reftek130Exception(msg)
+                st += tr
 
+        # only warn once, not for every single trace
+        if no_channel_code:
+            msg = ("No channel code specified in the data file and no "
+                   "component codes specified. Using stream label and number "
+                   "of channel in file as channel codes.")
+            warnings.warn(msg)
         return st
 
 
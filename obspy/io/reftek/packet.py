@@ -13,7 +13,6 @@ import warnings
 import numpy as np
 
 from obspy import UTCDateTime
-from obspy.core.compatibility import from_buffer
 from obspy.io.mseed.headers import clibmseed
 
 from .util import (
@@ -30,6 +29,11 @@ class Reftek130UnpackPacketError(ValueError):
 PACKET_TYPES_IMPLEMENTED = ("EH", "ET", "DT")
 PACKET_TYPES_NOT_IMPLEMENTED = ("AD", "CD", "DS", "FD", "OM", "SC", "SH")
 PACKET_TYPES = PACKET_TYPES_IMPLEMENTED + PACKET_TYPES_NOT_IMPLEMENTED
+# same as arrays of bytes, to test raw packet type fields against without
+# encoding/decoding on every check
+PACKET_TYPES_IMPLEMENTED_BYTES = np.array(PACKET_TYPES_IMPLEMENTED,
+                                          dtype="|S2")
+PACKET_TYPES_BYTES = np.array(PACKET_TYPES, dtype="|S2")
 
 
 # The extended header which is the same for EH/ET/DT packets.
@@ -89,6 +93,12 @@ EH_PAYLOAD = {
     "position": (894, 26, _decode_ascii),
     "reftek_120": (920, 80, None)}
 
+# same as above as (name, slice, converter) tuples, so that this does not need
+# to be done again for every single EH/ET packet
+_EH_PAYLOAD_FIELDS = tuple(
+    (name, slice(start, start + length), converter)
+    for name, (start, length, converter) in EH_PAYLOAD.items())
+
 
 # mseed steim compression is big endian
 if sys.byteorder == 'little':
@@ -98,6 +108,9 @@ else:
 
 
 class Packet(object):
+    # no instance dictionary, otherwise the slots of the subclasses would not
+    # have any effect
+    __slots__ = []
     _headers = ('experiment_number', 'unit_id', 'byte_count',
                 'packet_sequence', 'time')
 
@@ -145,8 +158,8 @@ class EHPacket(Packet):
         except AttributeError:
             # for numpy < 1.9.0, does not work for python 3.6
             payload = bytes(self._data["payload"])
-        for name, (start, length, converter) in EH_PAYLOAD.items():
-            data = payload[start:start + length]
+        for name, slice_, converter in _EH_PAYLOAD_FIELDS:
+            data = payload[slice_]
             if converter is not None:
                 data = converter(data)
             setattr(self, name, data)
@@ -232,18 +245,21 @@ def _initial_unpack_packets(bytestring):
     First unpack data with dtype matching itemsize of storage in the reftek
     file, than allocate result array with dtypes for storage of python
     objects/arrays and fill it with the unpacked data.
+
+    ``bytestring`` can be any object supporting the buffer protocol (e.g.
+    ``bytes`` or a :class:`mmap.mmap`).
     """
     if not len(bytestring):
         return np.array([], dtype=PACKET_FINAL_DTYPE)
 
     if len(bytestring) % 1024 != 0:
         tail = len(bytestring) % 1024
-        bytestring = bytestring[:-tail]
+        bytestring = memoryview(bytestring)[:-tail]
         msg = ("Length of data not a multiple of 1024. Data might be "
                "truncated. Dropping {:d} byte(s) at the end.").format(tail)
         warnings.warn(msg)
-    data = from_buffer(
-        bytestring, dtype=PACKET_INITIAL_UNPACK_DTYPE)
+    # no need to copy, this is only read from while filling the result array
+    data = np.frombuffer(bytestring, dtype=PACKET_INITIAL_UNPACK_DTYPE)
     result = np.empty_like(data, dtype=PACKET_FINAL_DTYPE)
 
     for name, dtype_initial, converter, dtype_final in PACKET:
@@ -252,13 +268,20 @@ def _initial_unpack_packets(bytestring):
         else:
             try:
                 result[name][:] = converter(data[name])
-            except Exception as e:
-                raise Reftek130UnpackPacketError(str(e))
+            # only errors from unpacking invalid data, anything else is
+            # likely a real problem and should not be disguised as such
+            except (ValueError, TypeError, IndexError) as e:
+                raise Reftek130UnpackPacketError(str(e)) from e
     # time unpacking is special and needs some additional work.
     # we need to add the POSIX timestamp of the start of respective year to the
     # already unpacked seconds into the respective year..
-    result['time'][:] += [_get_nanoseconds_for_start_of_year(y)
-                          for y in result['year']]
+    # only look up the few distinct years instead of building a list with one
+    # item per packet
+    years, inverse = np.unique(result['year'], return_inverse=True)
+    start_of_years = np.array(
+        [_get_nanoseconds_for_start_of_year(y) for y in years.tolist()],
+        dtype=np.int64)
+    result['time'][:] += start_of_years[inverse]
     return result
 
 
@@ -307,19 +330,19 @@ def _unpack_C0_C2_data_fast(packets, encoding):  # noqa
     encoding.
 
     Unfortunately the whole data cannot be unpacked with one call to
-    libmseed as some payloads do not take the full 960 bytes. They are
-    thus padded which would results in padded pieces directly in a large
-    array and libmseed (understandably) does not support that.
+    libmseed's Steim decoders as some payloads do not take the full 960
+    bytes. They are thus padded which would results in padded pieces
+    directly in a large array and libmseed (understandably) does not
+    support that.
 
-    Thus we resort to *tada* pointer arithmetics in Python ;-) This is
-    quite a bit faster then correctly casting to an integer pointer so
-    it's worth it.
+    Thus we pass the memory address of the first packed data byte, the
+    fixed offset between two packets in memory and the number of samples in
+    each packet to a small C helper which loops over all packets and
+    decodes them one after another into the preallocated output array. This
+    avoids one call across the Python/C boundary for every single packet.
 
     Also avoid a data copy.
 
-    Writing this directly in C would be about 3 times as fast so it might
-    be worth it.
-
     :type packets: :class:`numpy.ndarray` (dtype ``PACKET_FINAL_DTYPE``)
     :param packets: Array of data packets (``packet_type`` ``'DT'``) from which
         to unpack the sample data (with data encoding 'C0' or 'C2').
@@ -328,27 +351,24 @@ def _unpack_C0_C2_data_fast(packets, encoding):  # noqa
         packet, either ``'C0'`` or ``'C2'``.
     """
     if encoding == 'C0':
-        decode_steim = clibmseed.msr_decode_steim1
+        steim_version = 1
     elif encoding == 'C2':
-        decode_steim = clibmseed.msr_decode_steim2
+        steim_version = 2
     else:
         msg = "Unregonized encoding: '{}'".format(encoding)
         raise ValueError(msg)
-    npts = packets["number_of_samples"].sum()
+    number_of_samples = packets["number_of_samples"].astype(np.intc)
+    npts = number_of_samples.sum()
     unpacked_data = np.empty(npts, dtype=np.int32)
-    pos = 0
     s = packets[0]["payload"][40:].ctypes.data
     if len(packets) > 1:
         offset = (
             packets[1]["payload"][40:].ctypes.data - s)
     else:
         offset = 0
-    for _npts in packets["number_of_samples"]:
-        decode_steim(
-            s, 960, _npts, unpacked_data[pos:], _npts, None,
-            SWAPFLAG)
-        pos += _npts
-        s += offset
+    clibmseed.decodeSteimBlocks(
+        s, offset, 960, len(packets), number_of_samples, unpacked_data,
+        npts, steim_version, SWAPFLAG)
     return unpacked_data
 
 
@@ -16,6 +16,7 @@ from obspy.io.reftek.core import (
 from obspy.io.reftek.packet import (
     _unpack_C0_C2_data_fast, _unpack_C0_C2_data_safe, _unpack_C0_C2_data,
     EHPacket, _initial_unpack_packets)
+from obspy.io.reftek.util import _parse_long_time
 
 
 class ReftekTestCase(unittest.TestCase):
@@ -183,13 +184,13 @@ class ReftekTestCase(unittest.TestCase):
             st_reftek = _read_reftek130(
                 self.reftek_file, network="XX", location="01",
                 sort_permuted_package_sequence=True)
-        self.assertEqual(len(w), 8)
-        for w_ in w:
-            self.assertEqual(
-                str(w_.message),
-                'No channel code specified in the data file and no component '
-                'codes specified. Using stream label and number of channel in '
-                'file as channel codes.')
+        # warning is only shown once, not for each of the 8 traces
+        self.assertEqual(len(w), 1)
+        self.assertEqual(
+            str(w[0].message),
+            'No channel code specified in the data file and no component '
+            'codes specified. Using stream label and number of channel in '
+            'file as channel codes.')
         # check that channel codes are set with stream label from EH packet +
         # enumerated channel number starting at 0
         for tr, cha in zip(st_reftek, ('EH0', 'EH0', 'EH0', 'EH1', 'EH1',
@@ -618,6 +619,26 @@ class ReftekTestCase(unittest.TestCase):
         for tr, (_, expected) in zip(st, sorted(npz.items())):
             np.testing.assert_array_equal(expected, tr.data)
 
+    def test_parse_long_time(self):
+        """
+        Test parsing of long time strings of EH/ET packet payloads.
+        """
+        for string in (b"2015282225051000", b"2016366235959999",
+                       b"1999001000000001"):
+            expected = obspy.UTCDateTime.strptime(
+                string[:-3].decode(), "%Y%j%H%M%S")._ns
+            expected += int(string[-3:]) * 1000000
+            self.assertEqual(_parse_long_time(string), expected)
+        self.assertEqual(_parse_long_time(b" " * 16), None)
+        # invalid day of year, hour or second, non-digit characters or wrong
+        # length
+        for string in (b"2015000225051000", b"2015282245051000",
+                       b"2016366235960999", b"2016360235961999",
+                       b"2016 60235959999", b"2016360 35959999",
+                       b"2016360-15959999", b"2016360235959-99",
+                       b"201636023595999"):
+            self.assertRaises(ValueError, _parse_long_time, string)
+
 
 def suite():
     return unittest.makeSuite(ReftekTestCase, "test")
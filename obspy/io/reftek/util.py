@@ -1,6 +1,4 @@
 # -*- coding: utf-8 -*-
-import codecs
-
 import numpy as np
 
 from obspy import UTCDateTime
@@ -18,17 +16,61 @@ def bcd_16bit_int(_i):
 
 def bcd_hex(_i):
     m = _i.shape[1]
-    _bcd = codecs.encode(_i.ravel(), "hex_codec").decode("ASCII").upper()
+    _bcd = _i.tobytes().hex().upper()
     return from_buffer(_bcd, dtype="|S%d" % (m * 2))
 
 
+_HEX_DIGITS = np.frombuffer(b"0123456789ABCDEF", dtype=np.uint8)
+
+
 def bcd_8bit_hex(_i):
-    return np.array(["{:X}".format(int(x)) for x in _i], dtype="|S2")
+    """
+    Convert single bytes to their (upper case) hex representation, without
+    zero padding (e.g. ``0xC0`` to ``b"C0"`` and ``0x05`` to ``b"5"``).
+
+    Looks up the ASCII characters of both nibbles for all packets at once
+    instead of formatting every value separately in Python.
+    """
+    chars = np.zeros((len(_i), 2), dtype=np.uint8)
+    chars[:, 0] = _HEX_DIGITS[_i >> 4]
+    chars[:, 1] = _HEX_DIGITS[_i & 0xF]
+    single_digit = _i < 0x10
+    chars[single_digit, 0] = chars[single_digit, 1]
+    chars[single_digit, 1] = 0
+    return chars.view("|S2").ravel()
+
+
+# weights (in nanoseconds) of the twelve BCD digits of a "DDDHHMMSSsss"
+# packet time
+_BCD_TIME_DIGIT_NANOSECONDS = np.array([
+    100 * 86400 * 10 ** 9, 10 * 86400 * 10 ** 9, 86400 * 10 ** 9,
+    10 * 3600 * 10 ** 9, 3600 * 10 ** 9, 10 * 60 * 10 ** 9, 60 * 10 ** 9,
+    10 * 10 ** 9, 10 ** 9, 100 * 10 ** 6, 10 * 10 ** 6, 10 ** 6],
+    dtype=np.int64)
 
 
 def bcd_julian_day_string_to_nanoseconds_of_year(_i):
-    timestrings = bcd_hex(_i)
-    return _timestrings_to_nanoseconds(timestrings)
+    """
+    Convert BCD packet times of form "DDDHHMMSSsss" to integer nanoseconds
+    since start of the respective year.
+
+    Operates directly on the nibbles of the whole packet array at once,
+    without going through intermediate hex strings.
+
+    :type _i: :class:`numpy.ndarray`
+    :param _i: Array of shape ``(N, 6)`` of BCD encoded packet times.
+    :rtype: :class:`numpy.ndarray`
+    """
+    digits = np.empty((len(_i), 12), dtype=np.int64)
+    digits[:, 0::2] = _i >> 4
+    digits[:, 1::2] = _i & 0xF
+    if np.any(digits > 9):
+        msg = "Invalid BCD digit encountered in packet time."
+        raise ValueError(msg)
+    nanoseconds = digits.dot(_BCD_TIME_DIGIT_NANOSECONDS)
+    # day of year starts counting at 1
+    nanoseconds -= 86400 * 10 ** 9
+    return nanoseconds
 
 
 _timegm_cache = {}
@@ -44,6 +86,10 @@ def _get_nanoseconds_for_start_of_year(year):
         year += 2000
     else:
         year += 1900
+    return _get_nanoseconds_for_start_of_full_year(year)
+
+
+def _get_nanoseconds_for_start_of_full_year(year):
     try:
         ns = _timegm_cache[year]
     except KeyError:
@@ -52,32 +98,6 @@ def _get_nanoseconds_for_start_of_year(year):
     return ns
 
 
-def _timestrings_to_nanoseconds(timestrings):
-    """
-    Helper routine to convert timestrings of form "DDDHHMMSSsss" to array of
-    integer nanosecond POSIX timestamp.
-
-    :param timestring: numpy.ndarray
-    :rtype: numpy.ndarray
-    """
-    # split up the time string into tuple of
-    # (day of year, hours, minutes, seconds, milliseconds), still as string
-    nanoseconds = [(string[:3], string[3:5], string[5:7],
-                    string[7:9], string[9:]) for string in timestrings]
-    nanoseconds = np.array(nanoseconds, dtype="S3").astype(np.int64)
-    # now scale the columns of the array, so that everything is in nanoseconds
-    to_nano = 1000000000
-    nanoseconds[:, 0] -= 1
-    nanoseconds[:, 0] *= 86400 * to_nano
-    nanoseconds[:, 1] *= 3600 * to_nano
-    nanoseconds[:, 2] *= 60 * to_nano
-    nanoseconds[:, 3] *= to_nano
-    nanoseconds[:, 4] *= 1000000
-    # sum up days, hours, minutes etc. for every row of the array
-    nanoseconds = nanoseconds.sum(axis=1)
-    return nanoseconds
-
-
 def _decode_ascii(chars):
     return chars.decode("ASCII")
 
@@ -92,9 +112,25 @@ def _parse_long_time(time_bytestring, decode=True):
         time_string = time_bytestring
     if not time_string.strip():
         return None
-    time_string, milliseconds = time_string[:-3], int(time_string[-3:])
-    t = UTCDateTime.strptime(time_string, '%Y%j%H%M%S')
-    nanoseconds = t._ns
+    # time string is of form "YYYYDDDHHMMSSsss", avoid the comparatively
+    # expensive strptime and just do the arithmetic on top of the (cached)
+    # start of the year
+    if len(time_string) != 16 or not time_string.isdigit():
+        msg = "Invalid time string: '{}'".format(time_string)
+        raise ValueError(msg)
+    year = int(time_string[:4])
+    julday = int(time_string[4:7])
+    hour = int(time_string[7:9])
+    minute = int(time_string[9:11])
+    second = int(time_string[11:13])
+    milliseconds = int(time_string[13:])
+    if not (1 <= julday <= 366 and hour < 24 and minute < 60 and
+            second < 60):
+        msg = "Invalid time string: '{}'".format(time_string)
+        raise ValueError(msg)
+    nanoseconds = _get_nanoseconds_for_start_of_full_year(year)
+    nanoseconds += (
+        (((julday - 1) * 24 + hour) * 60 + minute) * 60 + second) * 10 ** 9
     nanoseconds += milliseconds * 1000000
     return nanoseconds
 